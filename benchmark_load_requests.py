@@ -0,0 +1,187 @@
+from velocity_lim import velocity_limit_compiler
+from velocity_lim.velocity_helpers import pass_all_limits, pass_daily_limit, pass_weekly_limit, pass_daily_vol, limit_checker
+from datetime import datetime, timedelta
+import argparse
+import filecmp
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import timeit
+
+
+def write_synthetic_input(
+    input_path: str,
+    num_attempts: int,
+    num_customers: int,
+    seed: int = 0,
+):
+    """writes num_attempts load attempts in ascending chronological order, spread over num_customers customers,
+    with a unique load id per attempt and roughly 1% duplicated load ids
+    
+    Parameters
+    ----------
+    input_path: str
+        path the synthetic input file will be written to
+    num_attempts: int
+        number of load attempts to write
+    num_customers: int
+        number of distinct customer ids
+    seed: int
+        seed of the random number generator, set to 0 by default
+    
+    Side Effects
+    ------------
+    writes the load attempts to input_path, one JSON payload per line
+    """
+    
+    rng = random.Random(seed)
+    attempt_time = datetime(2000, 1, 1)
+    
+    with open(input_path, 'w') as file:
+        for load_id in range(num_attempts):
+            
+            #Reuses the previous load id to exercise the duplicate id check
+            if load_id and rng.random() < 0.01:
+                load_id -= 1
+                
+            attempt_time += timedelta(seconds = rng.randint(0, 60))
+            load_attempt = {
+                "id": str(1000000 + load_id),
+                "customer_id": str(rng.randrange(num_customers)),
+                "load_amount": "${:.2f}".format(rng.uniform(1, 3000)),
+                "time": attempt_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            }
+            file.write(json.dumps(load_attempt) + '\n')
+
+
+def run_compiler(
+    input_path: str,
+    output_path: str,
+    encode_ids: bool,
+):
+    """parses and evaluates input_path and prints the throughput and peak RSS; meant to run in its own 
+    process so that the peak RSS only covers one run
+    
+    Parameters
+    ----------
+    input_path: str
+        path to the input file
+    output_path: str
+        path the output file will be written to
+    encode_ids: bool
+        whether the compiler encodes the customer ids and load ids
+    """
+    
+    #Peak RSS is reported in kilobytes on Linux and in bytes on macOS
+    rss_unit = 1024 if sys.platform == 'darwin' else 1
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // rss_unit
+    
+    start = time.perf_counter()
+    load_compiler = velocity_limit_compiler(input_txt_dir = input_path, encode_ids = encode_ids)
+    parsed = time.perf_counter()
+    load_compiler.output_to_text_file(output_path)
+    finished = time.perf_counter()
+    
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // rss_unit
+    num_attempts = len(load_compiler.load_attempt_list)
+    
+    print('{} ids'.format('encoded' if encode_ids else 'string'))
+    print('  parse:    {:.2f}s ({:,.0f} attempts/s)'.format(parsed - start, num_attempts / (parsed - start)))
+    print('  evaluate: {:.2f}s ({:,.0f} attempts/s)'.format(finished - parsed, num_attempts / (finished - parsed)))
+    print('  peak RSS: {:,} KB ({:,} KB above baseline)'.format(peak_rss, peak_rss - baseline_rss), flush = True)
+
+
+def pass_all_limits_bitwise(
+    load_amt: float,
+    daily_loaded_so_far: float,
+    weekly_loaded_so_far: float,
+    daily_vol_so_far: int,
+) -> bool:
+    """baseline limit evaluation that always runs all three limits, as pass_all_limits did before it short-circuited"""
+    
+    return pass_daily_limit(load_amt, daily_loaded_so_far) & \
+            pass_weekly_limit(load_amt, weekly_loaded_so_far) & \
+            pass_daily_vol(daily_vol_so_far)
+
+
+class recording_limit_checker(limit_checker):
+    
+    """limit_checker that records the arguments of every limit evaluation"""
+    
+    def __init__(self):
+        super().__init__()
+        self.recorded_args = []
+        
+    def first_failed_limit(self, *limit_args):
+        self.recorded_args.append(limit_args)
+        return super().first_failed_limit(*limit_args)
+
+
+def time_limit_checks(
+    input_path: str,
+    repeat: int = 5,
+):
+    """replays the limit evaluations made while processing input_path and prints the average time per evaluation 
+    of the bitwise baseline, pass_all_limits and limit_checker.first_failed_limit (best of repeat interleaved runs)
+    
+    Parameters
+    ----------
+    input_path: str
+        path to the input file
+    repeat: int
+        number of timed replays for each function, set to 5 by default
+    """
+    
+    load_compiler = velocity_limit_compiler(input_txt_dir = input_path)
+    load_compiler.limit_checker = recording_limit_checker()
+    load_compiler.output_to_text_file(os.devnull)
+    
+    recorded_args = load_compiler.limit_checker.recorded_args
+    rejected = sum(load_compiler.limit_checker.rejection_stats().values())
+    print('limit checks: {:,} evaluations, {:.1%} rejected, rejections {}'.format(
+        len(recorded_args), rejected / len(recorded_args), load_compiler.limit_checker.rejection_stats()))
+    
+    checks = {'bitwise &': pass_all_limits_bitwise, 'pass_all_limits': pass_all_limits,
+              'first_failed_limit': limit_checker().first_failed_limit}
+    best_times = {name: float('inf') for name in checks}
+    
+    #Interleaves the timed replays so that drifts in machine load affect every function alike
+    for _ in range(repeat):
+        for name, check in checks.items():
+            replay_time = timeit.timeit(lambda: [check(*limit_args) for limit_args in recorded_args], number = 1)
+            best_times[name] = min(best_times[name], replay_time)
+            
+    for name, best_time in best_times.items():
+        print('  {}: {:.0f} ns per evaluation'.format(name, best_time / len(recorded_args) * 1e9))
+
+
+if __name__ == "__main__":
+    
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input_path", type = str, help = 'path the synthetic input file will be written to', default = 'bench_input.txt') 
+    parser.add_argument("--output_path", type = str, help = 'path the output file will be written to', default = 'bench_output.txt') 
+    parser.add_argument("--num_attempts", type = int, help = 'number of synthetic load attempts', default = 500000) 
+    parser.add_argument("--num_customers", type = int, help = 'number of distinct synthetic customers', default = 200000) 
+    parser.add_argument("--run", choices = ['string', 'encoded'], help = 'runs a single compiler on an existing input; used internally', default = None) 
+    
+    args = parser.parse_args() 
+    
+    if args.run:
+        run_compiler(args.input_path, args.output_path, encode_ids = args.run == 'encoded')
+        
+    else:
+        write_synthetic_input(args.input_path, args.num_attempts, args.num_customers)
+        
+        #Runs the string-keyed and encoded compilers in separate processes so that their peak RSS can be compared
+        for run in ['string', 'encoded']:
+            subprocess.run([sys.executable, __file__, '--run', run, '--input_path', args.input_path,
+                            '--output_path', '{}.{}'.format(args.output_path, run)], check = True)
+            
+        print('outputs match:', filecmp.cmp(args.output_path + '.string', args.output_path + '.encoded', shallow = False))
+        print('note: encoded ids are expected to lower peak RSS only; throughput differences are within run-to-run noise')
+        
+        time_limit_checks(args.input_path)
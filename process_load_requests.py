@@ -1,4 +1,4 @@
-from velocity_lim import velocity_limit_compiler
+from velocity_lim import velocity_limit_compiler, tiered_customer_base
 import argparse
 
 if __name__ == "__main__":
@@ -6,13 +6,31 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--input_path", type = str, help = 'path to the input file (i.e. input.txt)', required = True) 
     parser.add_argument("--output_path", type = str, help = 'path the output file will be (i.e. python_output.txt)', required = True) 
+    parser.add_argument("--max_hot_customers", type = int, help = 'number of customers kept in memory; cold customers are spilled to --spill_path', default = None) 
+    parser.add_argument("--include_reason", action = 'store_true', help = 'adds the reason code of the limit that rejected each load attempt to the responses') 
+    parser.add_argument("--report_rejections", action = 'store_true', help = 'prints the number of rejected load attempts reported with each reason code') 
+    parser.add_argument("--spill_path", type = str, help = 'path to the SQLite file holding cold customers (i.e. customer_base.db)', default = ':memory:') 
     
     args = parser.parse_args() 
     input_path = args.input_path
     output_path = args.output_path
     
+    #Keeps every customer in memory unless a bound on the hot customers is given
+    customer_base = None
+    if args.max_hot_customers is not None:
+        customer_base = tiered_customer_base(spill_path = args.spill_path, max_hot_customers = args.max_hot_customers)
+    
     #Reads in the input path
-    load_compiler = velocity_limit_compiler(input_txt_dir = input_path)
+    load_compiler = velocity_limit_compiler(input_txt_dir = input_path, customer_base = customer_base, include_reason = args.include_reason)
     
     #Outputs the load responses to the output path specified 
-    load_compiler.output_to_text_file(output_path)
\ No newline at end of file
+    load_compiler.output_to_text_file(output_path)
+    
+    #Reports the cache hit rate and spill I/O of the tiered customer base
+    if customer_base is not None:
+        customer_base.close()
+        print(customer_base.cache_stats())
+        
+    #Reports how many rejected load attempts were reported with each reason code
+    if args.report_rejections:
+        print(load_compiler.limit_checker.rejection_stats())
\ No newline at end of file
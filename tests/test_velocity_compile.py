@@ -7,6 +7,7 @@ from datetime import datetime
 home_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
 sys.path.insert(1, home_dir)
 from velocity_lim.velocity_compile import velocity_limit_compiler
+from velocity_lim.velocity_helpers import encode_customer_base
 
 
 #Expected response output of the "input_all_attempts_accepted.txt" test case
@@ -112,7 +113,7 @@ def test_parse_text_file(txt_dir, expect):
     
     for i in range(0, len(test_compiler.load_attempt_list)): 
         
-        assert(test_compiler.load_attempt_list[i] == expect[i])
+        assert(test_compiler.decode_ids(test_compiler.load_attempt_list[i]) == expect[i])
         
 @pytest.mark.parametrize(
     "txt_dir, expect",
@@ -142,7 +143,69 @@ def test_evaluate_file(txt_dir, expect):
     
     for i in range(0, len(test_compiler.load_attempt_list)): 
         
-        assert(test_compiler.evaluate_transaction(test_compiler.load_attempt_list[i]) == expect[i])
+        load_response = test_compiler.evaluate_transaction(test_compiler.load_attempt_list[i])
+        
+        #Duplicate ids return None and have no ids to decode
+        if load_response:
+            load_response = test_compiler.decode_ids(load_response)
+        
+        assert(load_response == expect[i])
         
 
         
+
+
+def test_parse_text_file_encoded_ids():
+    """Test that the 'parse_text_file' function encodes the ids and reuses one encoded id per customer"""
+    test_compiler = velocity_limit_compiler(input_txt_dir = './tests/test_inputs/input_duplicated_id_first_instance_accepted.txt')
+    
+    assert([load_attempt['id'] for load_attempt in test_compiler.load_attempt_list] == [15887, 15887, 15888, 15889])
+    assert(len({id(load_attempt['customer_id']) for load_attempt in test_compiler.load_attempt_list}) == 1)
+    
+    
+def test_string_keyed_customer_base():
+    """Test that a customer_base keyed by the original id strings keeps deduplicating load ids once encoded"""
+    customer_base = encode_customer_base({"528": {"load_id_list": ["15887"]}})
+    test_compiler = velocity_limit_compiler(input_txt_dir = './tests/test_inputs/input_duplicated_id_first_instance_accepted.txt',
+                                            customer_base = customer_base)
+    
+    assert(customer_base == {528: {"load_id_list": [15887]}})
+    assert(test_compiler.evaluate_transaction(test_compiler.load_attempt_list[0]) is None)
+    
+    
+def test_shared_customer_base():
+    """Test that a customer_base filled by one compiler keeps the customers of another input apart"""
+    customer_base = {}
+    velocity_limit_compiler(input_txt_dir = './input.txt', customer_base = customer_base).output_to_text_file(os.devnull)
+    test_compiler = velocity_limit_compiler(input_txt_dir = './tests/test_inputs/input_all_attempts_accepted.txt',
+                                            customer_base = customer_base)
+    
+    load_responses = [test_compiler.decode_ids(test_compiler.evaluate_transaction(load_attempt))
+                      for load_attempt in test_compiler.load_attempt_list]
+    
+    assert(load_responses == all_attempts_accepted)
+    
+    
+def test_evaluate_file_include_reason():
+    """Test that the responses hold the reason code of the rejecting limit when include_reason is set"""
+    test_compiler = velocity_limit_compiler(input_txt_dir = './tests/test_inputs/input_not_accepted_over_daily_attempt_vol.txt',
+                                            include_reason = True)
+    
+    load_responses = [test_compiler.decode_ids(test_compiler.evaluate_transaction(load_attempt))
+                      for load_attempt in test_compiler.load_attempt_list]
+    
+    assert([load_response['reason'] for load_response in load_responses] == [None, None, None, 'daily_volume'])
+    assert(load_responses[3] == {"id":"15890","customer_id":"531" , "accepted": False, "reason": 'daily_volume'})
+    assert(test_compiler.limit_checker.rejection_stats()['daily_volume'] == 1)
+    
+    
+def test_customer_info_methods():
+    """Test the 'save_load_id', 'update_customer_info' and 'reset_daily_weekly_load_amt' functions"""
+    test_compiler = velocity_limit_compiler(input_txt_dir = './tests/test_inputs/input_not_accepted_over_daily_amt.txt')
+    
+    test_compiler.save_load_id(530, 15887)
+    test_compiler.update_customer_info(530, 3000.0, datetime(2021, 4, 23, 12, 0, 0))
+    test_compiler.reset_daily_weekly_load_amt(530, datetime(2021, 4, 24, 12, 0, 0))
+    
+    assert(test_compiler.customer_base[530] == {'load_id_list': [15887], 'loaded_so_far_today': 0, 'loaded_this_week': 3000.0,
+                                               'loaded_vol_today': 0, 'last_transaction': datetime(2021, 4, 23, 12, 0, 0)})
@@ -7,7 +7,8 @@ from datetime import datetime
 velocity_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../velocity_lim"))
 sys.path.insert(1, velocity_dir)
 
-from velocity_helpers import pass_all_limits, check_diff_start_date, check_diff_start_week
+from velocity_helpers import pass_all_limits, check_diff_start_date, check_diff_start_week, limit_checker, encode_id, decode_id, encode_customer_base, \
+    DAILY_AMOUNT, WEEKLY_AMOUNT, DAILY_VOLUME
 
 
 @pytest.mark.parametrize(
@@ -28,6 +29,41 @@ def test_pass_all_limits(load_amt, load_amt_today, week_load_amt, num_load_today
     
     assert pass_all_limits(load_amt, load_amt_today, week_load_amt, num_load_today) == expect
     
+
+@pytest.mark.parametrize(
+    "load_amt, load_amt_today, week_load_amt, num_load_today, expect",
+    [
+        (5000, 0, 0, 0, None),
+        (5001, 0, 0, 0, DAILY_AMOUNT),
+        (1000, 4500, 4500, 2, DAILY_AMOUNT),
+        (100, 250, 20000, 1, WEEKLY_AMOUNT),
+        (100, 250, 10000, 3, DAILY_VOLUME),
+        (100, 250, 12000, 2, None)
+    ]
+)
+def test_first_failed_limit(load_amt, load_amt_today, week_load_amt, num_load_today, expect):
+    """Test the 'first_failed_limit' function of the limit_checker class"""
+    
+    checker = limit_checker()
+    
+    assert checker.first_failed_limit(load_amt, load_amt_today, week_load_amt, num_load_today) == expect
+    assert sum(checker.rejection_stats().values()) == (expect is not None)
+    
+    
+def test_limit_checker_rejection_counts():
+    """Test that the limit_checker reports a fixed-precedence reason and counts the reported reasons"""
+    
+    checker = limit_checker()
+    
+    for _ in range(3):
+        assert checker.first_failed_limit(100, 250, 10000, 3) == DAILY_VOLUME
+        
+    #Fails both the weekly amount and the daily volume; the reason does not depend on previous rejections
+    assert checker.first_failed_limit(100, 0, 20000, 3) == WEEKLY_AMOUNT
+    assert limit_checker().first_failed_limit(100, 0, 20000, 3) == WEEKLY_AMOUNT
+    
+    assert checker.rejection_stats() == {DAILY_AMOUNT: 0, WEEKLY_AMOUNT: 1, DAILY_VOLUME: 3}
+    
     
 @pytest.mark.parametrize(
     "load_date_1, load_date_2,expect",
@@ -55,4 +91,39 @@ def test_check_diff_start_date(load_date_1, load_date_2, expect):
 def test_check_diff_start_week(load_date_1, load_date_2, expect):
     """Test the 'check_diff_start_date' function """
     
-    assert check_diff_start_week(load_date_1, load_date_2) == expect
\ No newline at end of file
+    assert check_diff_start_week(load_date_1, load_date_2) == expect
+    
+    
+@pytest.mark.parametrize(
+    "id_string, expect",
+    [
+        ("15887", 15887),
+        ("0", 0),
+        ("015887", "015887"),
+        ("+15887", "+15887"),
+        ("1_5887", "1_5887"),
+        ("abc", "abc")
+    ]
+)
+def test_encode_id(id_string, expect):
+    """Test the 'encode_id' function and that 'decode_id' restores the original string"""
+    
+    assert encode_id(id_string) == expect
+    assert type(encode_id(id_string)) == type(expect)
+    assert decode_id(encode_id(id_string)) == id_string
+
+    
+    
+def test_encode_customer_base():
+    """Test the 'encode_customer_base' function and that it refuses colliding customer ids"""
+    
+    customer_base = {"528": {"load_id_list": ["15887", "x1"]}, "abc": {"load_id_list": ["15888"]}, 529: {"load_id_list": [15889]}}
+    
+    assert encode_customer_base(customer_base) == {528: {"load_id_list": [15887, "x1"]}, "abc": {"load_id_list": [15888]},
+                                                   529: {"load_id_list": [15889]}}
+    
+    colliding_base = {"5": {"load_id_list": ["15887"]}, 5: {"load_id_list": [15888]}}
+    
+    with pytest.raises(ValueError):
+        encode_customer_base(colliding_base)
+    assert colliding_base == {"5": {"load_id_list": ["15887"]}, 5: {"load_id_list": [15888]}}
@@ -0,0 +1,140 @@
+"""Tiered customer store test module
+"""
+import pytest
+import sys, os
+from datetime import datetime
+
+home_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(1, home_dir)
+from velocity_lim.velocity_compile import velocity_limit_compiler
+from velocity_lim.velocity_store import tiered_customer_base
+
+
+@pytest.mark.parametrize(
+    "txt_dir, max_hot_customers, chunk_size, write_batch_size",
+    [
+        ('./input.txt', 1, 1, 1),
+        ('./input.txt', 3, 7, 2),
+        ('./input.txt', 20, 50, 10),
+        ('./tests/test_inputs/input_duplicated_id_first_instance_rejected.txt', 1, 2, 1),
+        ('./tests/test_inputs/input_not_accepted_over_weekly_amt.txt', 1, 3, 1),
+    ]
+)
+def test_tiered_customer_base_matches_in_memory(tmp_path, txt_dir, max_hot_customers, chunk_size, write_batch_size):
+    """Test that the velocity_limit_compiler returns the same responses with a tiered_customer_base"""
+
+    in_memory_compiler = velocity_limit_compiler(input_txt_dir = txt_dir)
+    in_memory_compiler.output_to_text_file(str(tmp_path / 'in_memory_output.txt'))
+
+    tiered_base = tiered_customer_base(spill_path = str(tmp_path / 'customer_base.db'),
+                                       max_hot_customers = max_hot_customers,
+                                       write_batch_size = write_batch_size)
+    tiered_compiler = velocity_limit_compiler(input_txt_dir = txt_dir, customer_base = tiered_base, chunk_size = chunk_size)
+    tiered_compiler.output_to_text_file(str(tmp_path / 'tiered_output.txt'))
+
+    with open(tmp_path / 'in_memory_output.txt') as in_memory_output, open(tmp_path / 'tiered_output.txt') as tiered_output:
+        assert in_memory_output.read() == tiered_output.read()
+
+    assert tiered_base.cache_stats()['hot_customers'] <= max_hot_customers
+    assert len(tiered_base) == len(in_memory_compiler.customer_base)
+
+
+def test_tiered_customer_base_spill_round_trip():
+    """Test that evicted customers are written back and restored from the spill store"""
+
+    tiered_base = tiered_customer_base(max_hot_customers = 1, write_batch_size = 1)
+
+    tiered_base['527'] = {'load_id_list': ['15881'], 'last_transaction': datetime(2021, 4, 20, 12, 0, 0)}
+    tiered_base['527']['loaded_vol_today'] = 1
+    tiered_base['528'] = {'load_id_list': ['15887']}
+
+    assert '527' in tiered_base
+    assert '529' not in tiered_base
+    assert tiered_base['527'] == {'load_id_list': ['15881'], 'last_transaction': datetime(2021, 4, 20, 12, 0, 0),
+                                  'loaded_vol_today': 1}
+
+    cache_stats = tiered_base.cache_stats()
+    assert cache_stats['spill_reads'] == 1
+    assert cache_stats['spill_writes'] == 2
+    assert cache_stats['misses'] == 1
+    assert cache_stats['hit_rate'] == 0.5
+
+    with pytest.raises(KeyError):
+        tiered_base['529']
+
+
+@pytest.mark.parametrize(
+    "resume, expect",
+    [
+        (False, []),
+        (True, ['527']),
+    ]
+)
+def test_tiered_customer_base_reopen(tmp_path, resume, expect):
+    """Test that reopening a spill store only keeps the previous customers when resuming"""
+
+    spill_path = str(tmp_path / 'customer_base.db')
+
+    tiered_base = tiered_customer_base(spill_path = spill_path)
+    tiered_base['527'] = {'load_id_list': ['15881']}
+    tiered_base.close()
+
+    reopened_base = tiered_customer_base(spill_path = spill_path, resume = resume)
+
+    assert list(reopened_base) == expect
+
+
+def test_tiered_customer_base_repeated_spill_path(tmp_path):
+    """Test that running the same input twice against one spill path gives the same responses both times"""
+
+    spill_path = str(tmp_path / 'customer_base.db')
+    outputs = []
+
+    for run in range(2):
+        tiered_base = tiered_customer_base(spill_path = spill_path, max_hot_customers = 5)
+        test_compiler = velocity_limit_compiler(input_txt_dir = './input.txt', customer_base = tiered_base)
+        test_compiler.output_to_text_file(str(tmp_path / 'output_{}.txt'.format(run)))
+        tiered_base.close()
+
+        with open(tmp_path / 'output_{}.txt'.format(run)) as output:
+            outputs.append(output.read())
+
+    assert outputs[0] == outputs[1]
+    assert len(outputs[0].splitlines()) == 999
+
+
+def test_tiered_customer_base_prefetch_clean_entries():
+    """Test that prefetch is capped at the cache size and that clean prefetched customers are not written back"""
+
+    tiered_base = tiered_customer_base(max_hot_customers = 2, write_batch_size = 1)
+
+    for customer_id in ['527', '528', '529']:
+        tiered_base[customer_id] = {'load_id_list': []}
+    tiered_base.flush()
+    spill_writes = tiered_base.cache_stats()['spill_writes']
+
+    tiered_base.prefetch(['527', '528', '529'])
+    cache_stats = tiered_base.cache_stats()
+
+    assert list(tiered_base._hot_customers) == ['528', '527']
+    assert cache_stats['spill_reads'] == 1
+
+    #Evicting prefetched customers that were never looked up writes nothing
+    tiered_base['530'] = {'load_id_list': []}
+    tiered_base['531'] = {'load_id_list': []}
+    assert tiered_base.cache_stats()['spill_writes'] == spill_writes
+
+
+def test_tiered_customer_base_memory_bound():
+    """Test that no more than max_hot_customers customers are held in memory and that every miss reads the spill store"""
+
+    tiered_base = tiered_customer_base(max_hot_customers = 5, write_batch_size = 2)
+    test_compiler = velocity_limit_compiler(input_txt_dir = './input.txt', customer_base = tiered_base)
+
+    for load_attempt in test_compiler.load_attempt_list:
+        test_compiler.evaluate_transaction(load_attempt)
+        assert len(tiered_base._hot_customers) <= 5
+
+    cache_stats = tiered_base.cache_stats()
+    assert cache_stats['misses'] == cache_stats['spill_reads']
+    assert cache_stats['misses'] > 0
@@ -1 +1,2 @@
-from velocity_lim.velocity_compile import velocity_limit_compiler
\ No newline at end of file
+from velocity_lim.velocity_compile import velocity_limit_compiler
+from velocity_lim.velocity_store import tiered_customer_base
\ No newline at end of file
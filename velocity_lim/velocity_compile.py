@@ -2,8 +2,8 @@
 
 from datetime import datetime
 from datetime import timedelta
-from typing import Dict, List
-from .velocity_helpers import pass_all_limits, check_diff_start_week, check_diff_start_date
+from typing import Dict, List, Optional, Union
+from .velocity_helpers import limit_checker, check_diff_start_week, check_diff_start_date, encode_id, decode_id
 import json
 
 class velocity_limit_compiler:
@@ -13,21 +13,49 @@ class velocity_limit_compiler:
     
     Parameters
     ----------
-    customer_base: Dict[str, Dict]
-        Nested dictionary where the keys are the customer_id and values for each key is a  
-        dictionary containing information on the remaining limits for that customer   
+    customer_base: Dict[Union[int, str], Dict]
+        Nested dictionary where the keys are the encoded customer_id and values for each key is a  
+        dictionary containing information on the remaining limits for that customer; a 
+        tiered_customer_base can be passed instead to spill cold customers to disk. A dictionary keyed 
+        by the original id strings has to be converted once with velocity_helpers.encode_customer_base
         
     input_txt_dir: str
         directory to the input.txt file
+        
+    chunk_size: int
+        number of load attempts evaluated between prefetches of the customer_base, set to 1,000 by default
+        
+    include_reason: bool
+        if True, each response will also hold the reason code of the limit that rejected the load attempt 
+        (None if accepted), set to False by default
+        
+    encode_ids: bool
+        if True, customer ids and load ids are encoded with encode_id when the input is parsed, 
+        set to True by default
+        
+    Notes
+    -----
+    encoded ids are used for the customer_base keys, the load_id_list entries and the responses of 
+    evaluate_transaction; the original strings are only restored by decode_ids when the responses are 
+    written out. Since the encoding does not depend on the input, a customer_base can be shared between 
+    compilers. Ids that are not plain decimal numbers stay strings, so keys can mix int and str; the encoding 
+    reduces memory usage but not the cost of hashing the ids
     """
     
     def __init__(
         self,
         input_txt_dir: str,
-        customer_base: Dict = {},
+        customer_base: Optional[Dict] = None,
+        chunk_size: int = 1000,
+        include_reason: bool = False,
+        encode_ids: bool = True,
     ):
         self.input_txt_dir = input_txt_dir
-        self.customer_base = customer_base
+        self.customer_base = customer_base if customer_base is not None else {}
+        self.chunk_size = chunk_size
+        self.include_reason = include_reason
+        self.encode_ids = encode_ids
+        self.limit_checker = limit_checker()
         self.load_attempt_list = self.parse_text_file(self.input_txt_dir)
           
     def parse_text_file(
@@ -44,21 +72,60 @@ class velocity_limit_compiler:
         Returns
         ------- 
         Dict:
-            a list of dictionaries where each dictionary corresponds to a load fund attempt
+            a list of dictionaries where each dictionary corresponds to a load fund attempt, with the 
+            customer id and load id encoded if encode_ids is set
         
         """
         load_attempt_list = []   
         
+        #Reuses one encoded id per customer instead of allocating one per load attempt; only needed while parsing
+        customer_id_codes = {}
+        
         with open(text_dir) as f: 
             for line in f:
-                load_attempt_list.append(eval(line))
-        
-        #Converts the time string to the corresponding time values in datetime and load amount to float
-        for item in load_attempt_list:
-            item['time'] =  datetime.strptime(item['time'], "%Y-%m-%dT%H:%M:%SZ")
-            item['load_amount'] = float(item['load_amount'][1:])
+                item = eval(line)
+                
+                #Converts the time string to the corresponding time values in datetime and load amount to float
+                item['time'] =  datetime.strptime(item['time'], "%Y-%m-%dT%H:%M:%SZ")
+                item['load_amount'] = float(item['load_amount'][1:])
+                
+                #Encodes the ids line by line so that the id strings are released before the next line is read
+                if self.encode_ids:
+                    customer_id = customer_id_codes.get(item['customer_id'])
+
+                    if customer_id is None:
+                        customer_id = customer_id_codes[item['customer_id']] = encode_id(item['customer_id'])
+
+                    item['customer_id'] = customer_id
+                    item['id'] = encode_id(item['id'])
+                    
+                load_attempt_list.append(item)
             
         return load_attempt_list
+    
+    def decode_ids(
+        self,
+        load_record: Dict,
+    ) -> Dict:
+        """restores the original customer id and load id strings of a parsed load attempt or of a load response
+        
+        Parameters
+        ----------
+        load_record: Dict[str, Any]
+            load attempt or load response with the customer id and load id encoded
+            
+        Returns
+        -------
+        Dict:
+            copy of load_record with the original id strings, keys are kept in the same order
+        
+        """
+        
+        decoded_record = dict(load_record)
+        decoded_record['id'] = decode_id(load_record['id'])
+        decoded_record['customer_id'] = decode_id(load_record['customer_id'])
+        
+        return decoded_record
         
         
     def output_to_text_file(
@@ -79,15 +146,25 @@ class velocity_limit_compiler:
         
         """
         
+        #Only tiered customer bases support prefetching; plain dictionaries already hold every customer in memory
+        prefetch = getattr(self.customer_base, 'prefetch', None)
+        
         with open(output_dir,'w') as file:
             
-            for load_attempt in self.load_attempt_list: 
-                load_response = self.evaluate_transaction(load_attempt)
+            for chunk_start in range(0, len(self.load_attempt_list), self.chunk_size):
+                load_attempt_chunk = self.load_attempt_list[chunk_start:chunk_start + self.chunk_size]
                 
-                #Ensures load_response is not null; this will be the case for duplicate ids
-                if load_response:
-                    json.dump(load_response, file)
-                    file.write('\n')
+                #Loads the customers referenced in the chunk into memory in a single batch
+                if prefetch:
+                    prefetch(load_attempt['customer_id'] for load_attempt in load_attempt_chunk)
+            
+                for load_attempt in load_attempt_chunk: 
+                    load_response = self.evaluate_transaction(load_attempt)
+
+                    #Ensures load_response is not null; this will be the case for duplicate ids
+                    if load_response:
+                        json.dump(self.decode_ids(load_response), file)
+                        file.write('\n')
                 
                 
     def evaluate_transaction(
@@ -113,85 +190,123 @@ class velocity_limit_compiler:
         
         """
         
+        #Looks up the customer once per attempt; None if the customer is not in the database
+        customer_info = self.customer_base.get(load_attempt['customer_id'])
+        
         #Checks if the customer id is already in the database and if the customer has made a successful transaction
-        if load_attempt['customer_id'] in self.customer_base.keys():
+        if customer_info is not None:
             
             #Checks if the customer has made a successful transaction
-            if self.customer_base[load_attempt['customer_id']].get('last_transaction'):
+            if customer_info.get('last_transaction'):
             
                 #Ensure load id is not already in the list of previously used ids by the customer; else the attempt will be ignored
-                if load_attempt['id'] not in self.customer_base[load_attempt['customer_id']]['load_id_list'] :
+                if load_attempt['id'] not in customer_info['load_id_list'] :
 
                     #Saves the load id for the given customer
-                    self.save_load_id(load_attempt['customer_id'], load_attempt['id'])
+                    self._save_load_id(customer_info, load_attempt['id'])
 
                     #refreshes the daily and weekly limit if the time of incoming attempt is outside of the day or week range of the previous transaction
-                    self.reset_daily_weekly_load_amt(load_attempt['customer_id'], load_attempt['time'])
-
-                    customer_info = self.customer_base[load_attempt['customer_id']]
+                    self._reset_daily_weekly_load_amt(customer_info, load_attempt['time'])
 
-                    if pass_all_limits(load_attempt['load_amount'], customer_info['loaded_so_far_today'],
-                                       customer_info['loaded_this_week'], customer_info['loaded_vol_today']):
+                    reason = self.limit_checker.first_failed_limit(load_attempt['load_amount'], customer_info['loaded_so_far_today'],
+                                                                   customer_info['loaded_this_week'], customer_info['loaded_vol_today'])
+                    
+                    if reason is None:
 
                         #Updates the information of the transaction if it passes all limits
-                        self.update_customer_info(load_attempt['customer_id'], load_attempt['load_amount'], load_attempt['time'])
+                        self._update_customer_info(customer_info, load_attempt['load_amount'], load_attempt['time'])
 
-                        return {"id":load_attempt['id'], "customer_id":load_attempt['customer_id'], "accepted": True}
+                        return self.build_load_response(load_attempt, None)
 
                     else:     
 
-                        return {"id":load_attempt['id'], "customer_id":load_attempt['customer_id'], "accepted": False}
+                        return self.build_load_response(load_attempt, reason)
             
             #If customer id is in database but has not made a successful transaction
             else:
                 
                 #Ensure load id is not already in the list of previously used ids by the customer; else the attempt will be ignored
-                if load_attempt['id'] not in self.customer_base[load_attempt['customer_id']]['load_id_list'] :
+                if load_attempt['id'] not in customer_info['load_id_list'] :
                     
                     #Saves the load id for the given customer
-                    self.save_load_id(load_attempt['customer_id'], load_attempt['id'])
+                    self._save_load_id(customer_info, load_attempt['id'])
+                    
+                    reason = self.limit_checker.first_failed_limit(load_attempt['load_amount'], 0, 0, 0)
                     
-                    if pass_all_limits(load_attempt['load_amount'], 0, 0, 0):
+                    if reason is None:
                 
                         #Update the information of the transaction if it passes all limits
-                        self.update_customer_info(load_attempt['customer_id'], load_attempt['load_amount'], load_attempt['time'])
+                        self._update_customer_info(customer_info, load_attempt['load_amount'], load_attempt['time'])
 
-                        return {"id":load_attempt['id'], "customer_id":load_attempt['customer_id'], "accepted": True}
+                        return self.build_load_response(load_attempt, None)
 
                     else: 
 
-                        return {"id":load_attempt['id'], "customer_id":load_attempt['customer_id'], "accepted": False}
+                        return self.build_load_response(load_attempt, reason)
                     
             
         else: 
             
-            #Saves the load id for the given customer
-            self.save_load_id(load_attempt['customer_id'], load_attempt['id'])
+            #Initializes the customer in the customer_base and saves the load id
+            customer_info = {'load_id_list': []}
+            self.customer_base[load_attempt['customer_id']] = customer_info
+            self._save_load_id(customer_info, load_attempt['id'])
             
-            if pass_all_limits(load_attempt['load_amount'], 0, 0, 0):
+            reason = self.limit_checker.first_failed_limit(load_attempt['load_amount'], 0, 0, 0)
+            
+            if reason is None:
                 
                 #Update the information of the transaction if it passes all limits
-                self.update_customer_info(load_attempt['customer_id'], load_attempt['load_amount'], load_attempt['time'])
+                self._update_customer_info(customer_info, load_attempt['load_amount'], load_attempt['time'])
                 
-                return {"id":load_attempt['id'], "customer_id":load_attempt['customer_id'], "accepted": True}
+                return self.build_load_response(load_attempt, None)
     
             else: 
             
-                return {"id":load_attempt['id'], "customer_id":load_attempt['customer_id'], "accepted": False}
+                return self.build_load_response(load_attempt, reason)
+            
+    def build_load_response(
+        self,
+        load_attempt: Dict,
+        reason: Optional[str],
+    ) -> Dict:
+        """builds the JSON response of an evaluated load attempt
+        
+        Parameters
+        ----------
+        load_attempt: Dict[str, Any]
+            Dictionary storing the information regarding the attempted load 
+        reason: Optional[str]
+            reason code of the limit that rejected the load attempt, None if it was accepted
+            
+        Returns
+        ------- 
+        Dict:
+            JSON output indicating whether the load attempt has been accepted or rejected, with the reason 
+            code added if include_reason is set
+        
+        """
+        
+        load_response = {"id":load_attempt['id'], "customer_id":load_attempt['customer_id'], "accepted": reason is None}
+        
+        if self.include_reason:
+            load_response['reason'] = reason
+            
+        return load_response
             
     def save_load_id(
         self,
-        customer_id: str,
-        load_id: str,
+        customer_id: Union[int, str],
+        load_id: Union[int, str],
     ):
         """saves the load_id of a load attempt regardless if it succeeds or not 
         
         Parameters
         ----------
-        customer_id: str
-            id of the customer
-        load_id: str
-            id of load attempt
+        customer_id: Union[int, str]
+            encoded id of the customer
+        load_id: Union[int, str]
+            encoded id of load attempt
             
         Side Effects
         ------------ 
@@ -207,11 +322,11 @@ class velocity_limit_compiler:
             self.customer_base[customer_id]['load_id_list'] = []
         
         
-        self.customer_base[customer_id]['load_id_list'].append(load_id)
+        self._save_load_id(self.customer_base[customer_id], load_id)
             
     def update_customer_info(
         self,
-        customer_id: str,
+        customer_id: Union[int, str],
         load_amt: float,
         attempt_time: datetime,
     ):
@@ -219,8 +334,8 @@ class velocity_limit_compiler:
         
         Parameters
         ----------
-        customer_id: str
-            id of the customer
+        customer_id: Union[int, str]
+            encoded id of the customer
         
         load_amt: float
             amount loaded in the transaction
@@ -234,24 +349,19 @@ class velocity_limit_compiler:
         
         """
         
-        customer_info = self.customer_base[customer_id]
-        
-        self.customer_base[customer_id]['loaded_so_far_today'] = load_amt + customer_info.get('loaded_so_far_today', 0.0)
-        self.customer_base[customer_id]['loaded_this_week'] = load_amt + customer_info.get('loaded_this_week', 0.0)
-        self.customer_base[customer_id]['loaded_vol_today'] = 1 + customer_info.get('loaded_vol_today', 0.0)
-        self.customer_base[customer_id]['last_transaction'] = attempt_time
+        self._update_customer_info(self.customer_base[customer_id], load_amt, attempt_time)
         
     def reset_daily_weekly_load_amt(
         self,
-        customer_id: str,
+        customer_id: Union[int, str],
         attempt_time: datetime,
     ):
         """resets the daily and weekly load amount, and daily load volume if the incoming load attempt is outside the day and week range from previous transaction
         
         Parameters
         ----------
-        customer_id: str
-            id of the customer
+        customer_id: Union[int, str]
+            encoded id of the customer
         
         attempt_time: datetime.datetime
             datetime of the transaction
@@ -263,15 +373,45 @@ class velocity_limit_compiler:
         No changes otherwise
         """
         
-        if check_diff_start_week(self.customer_base[customer_id]['last_transaction'], attempt_time):
-            
-            self.customer_base[customer_id]['loaded_this_week'] = 0
-            
-        if check_diff_start_date(self.customer_base[customer_id]['last_transaction'], attempt_time):
-            
-            self.customer_base[customer_id]['loaded_so_far_today'] = 0
-            self.customer_base[customer_id]['loaded_vol_today'] = 0
+        self._reset_daily_weekly_load_amt(self.customer_base[customer_id], attempt_time)
+        
+    #The methods below work on a customer entry already looked up by evaluate_transaction, so that each attempt
+    #costs a single lookup in the customer_base
+    
+    def _save_load_id(
+        self,
+        customer_info: Dict,
+        load_id: Union[int, str],
+    ):
+        """save_load_id on the customer entry customer_info"""
+        
+        customer_info['load_id_list'].append(load_id)
+        
+    def _update_customer_info(
+        self,
+        customer_info: Dict,
+        load_amt: float,
+        attempt_time: datetime,
+    ):
+        """update_customer_info on the customer entry customer_info"""
+        
+        customer_info['loaded_so_far_today'] = load_amt + customer_info.get('loaded_so_far_today', 0.0)
+        customer_info['loaded_this_week'] = load_amt + customer_info.get('loaded_this_week', 0.0)
+        customer_info['loaded_vol_today'] = 1 + customer_info.get('loaded_vol_today', 0.0)
+        customer_info['last_transaction'] = attempt_time
+        
+    def _reset_daily_weekly_load_amt(
+        self,
+        customer_info: Dict,
+        attempt_time: datetime,
+    ):
+        """reset_daily_weekly_load_amt on the customer entry customer_info"""
+        
+        if check_diff_start_week(customer_info['last_transaction'], attempt_time):
             
+            customer_info['loaded_this_week'] = 0
             
+        if check_diff_start_date(customer_info['last_transaction'], attempt_time):
             
-            
\ No newline at end of file
+            customer_info['loaded_so_far_today'] = 0
+            customer_info['loaded_vol_today'] = 0
@@ -2,6 +2,12 @@
 
 from datetime import datetime
 from datetime import timedelta
+from typing import Dict, Optional, Union
+
+#Reason codes returned when a load attempt fails one of the limits
+DAILY_AMOUNT = 'daily_amount'
+WEEKLY_AMOUNT = 'weekly_amount'
+DAILY_VOLUME = 'daily_volume'
 
 def pass_daily_limit(
     load_amt: float,
@@ -106,11 +112,173 @@ def pass_all_limits(
         True if load attempt passes all three limit thresholds 
         False otherwise
     """
-    return pass_daily_limit(load_amt, daily_loaded_so_far) & \
-            pass_weekly_limit(load_amt, weekly_loaded_so_far) & \
+    return pass_daily_limit(load_amt, daily_loaded_so_far) and \
+            pass_weekly_limit(load_amt, weekly_loaded_so_far) and \
             pass_daily_vol(daily_vol_so_far)
     
 
+class limit_checker:
+    
+    """limit_checker class.
+    Evaluates the three limits of a load attempt in order of reason_precedence, stopping at the first limit 
+    that fails, and keeps track of how often each limit rejects an attempt. Each limit is evaluated at most 
+    once and the reported reason is always the first failed limit in order of reason_precedence.
+        
+    Attributes
+    ----------
+    rejection_counts: Dict[str, int]
+        number of rejected load attempts for each reported reason code
+    """
+    
+    #Reason codes in the order the limits are checked and reported
+    reason_precedence = (DAILY_AMOUNT, WEEKLY_AMOUNT, DAILY_VOLUME)
+    
+    def __init__(self):
+        self.rejection_counts = {reason: 0 for reason in self.reason_precedence}
+        
+    def first_failed_limit(
+        self,
+        load_amt: float,
+        daily_loaded_so_far: float,
+        weekly_loaded_so_far: float,
+        daily_vol_so_far: int,
+    ) -> Optional[str]:
+        """Returns the reason code of the first limit, in order of reason_precedence, the attempted load fails
+        
+        Parameters
+        ----------
+        load_amt: float
+            amount to load in current transaction
+        daily_loaded_so_far: float
+            amount loaded so far in the day
+        weekly_loaded_so_far: float
+            amount loaded so far in the week
+        daily_vol_so_far: int
+            number of accepted load attempts so far in the day
+            
+        Returns
+        -------
+        Optional[str]:
+            None if load attempt passes all three limit thresholds
+            reason code of the first failed limit otherwise
+            
+        Side Effects
+        ------------ 
+        the rejection count of the reported reason is incremented
+        """
+        
+        if not pass_daily_limit(load_amt, daily_loaded_so_far):
+            reason = DAILY_AMOUNT
+        elif not pass_weekly_limit(load_amt, weekly_loaded_so_far):
+            reason = WEEKLY_AMOUNT
+        elif not pass_daily_vol(daily_vol_so_far):
+            reason = DAILY_VOLUME
+        else:
+            return None
+        
+        self.rejection_counts[reason] += 1
+        
+        return reason
+        
+    def rejection_stats(self) -> Dict[str, int]:
+        """Returns a copy of the number of rejected load attempts for each reported reason code"""
+        
+        return dict(self.rejection_counts)
+
+
+def encode_id(
+    id_string: str
+) -> Union[int, str]:
+    """Encodes a customer id or load id as the integer it spells out, so that the string does not need to be kept
+    (i.e. "15887" is encoded as 15887 but "015887" and "abc" have no integer encoding and are returned as is)
+    
+    Parameters
+    ----------
+    id_string: str
+        customer id or load id as it appears in the input
+        
+    Returns
+    -------
+    Union[int, str]:
+        integer value of id_string if decode_id restores the same string from it
+        id_string otherwise
+    """
+    
+    try:
+        id_code = int(id_string)
+    except ValueError:
+        return id_string
+    
+    return id_code if str(id_code) == id_string else id_string
+
+
+def decode_id(
+    id_code: Union[int, str]
+) -> str:
+    """Restores the customer id or load id string encoded by encode_id
+    
+    Parameters
+    ----------
+    id_code: Union[int, str]
+        id encoded by encode_id
+        
+    Returns
+    -------
+    str:
+        customer id or load id as it appeared in the input
+    """
+    
+    return id_code if isinstance(id_code, str) else str(id_code)
+
+
+def encode_customer_base(
+    customer_base: Dict[Union[int, str], Dict]
+) -> Dict[Union[int, str], Dict]:
+    """Converts, in place, a customer_base keyed by the original id strings to encoded ids; meant to be run once
+    on a customer_base created before ids were encoded
+    
+    Parameters
+    ----------
+    customer_base: Dict[Union[int, str], Dict]
+        customer_base whose customer ids and load ids may still be the original id strings
+        
+    Returns
+    -------
+    Dict[Union[int, str], Dict]:
+        customer_base, with every customer keyed by its encoded id and every load id in the load_id_list encoded
+        
+    Raises
+    ------
+    ValueError:
+        if two customers have the same encoded id (i.e. "5" and 5); customer_base is left unchanged
+    """
+    
+    string_keys = [customer_id for customer_id in customer_base if isinstance(customer_id, str)]
+    encoded_keys = {}
+    
+    #Checks every key before changing anything so that a collision leaves customer_base untouched
+    for customer_id in string_keys:
+        encoded_id = encode_id(customer_id)
+        
+        if encoded_id != customer_id:
+            
+            if encoded_id in customer_base or encoded_id in encoded_keys:
+                raise ValueError('customer id {!r} encodes to {!r}, which is already in the customer_base'.format(
+                    customer_id, encoded_id))
+                
+            encoded_keys[encoded_id] = customer_id
+    
+    for customer_id in string_keys:
+        customer_info = customer_base[customer_id]
+        customer_info['load_id_list'] = [encode_id(load_id) if isinstance(load_id, str) else load_id
+                                         for load_id in customer_info['load_id_list']]
+        
+    for encoded_id, customer_id in encoded_keys.items():
+        customer_base[encoded_id] = customer_base.pop(customer_id)
+        
+    return customer_base
+
+
 def get_start_of_day(
     date_of_load: datetime
 ) -> datetime:
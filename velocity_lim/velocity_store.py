@@ -0,0 +1,306 @@
+"""Tiered customer state store used in place of the all-in-memory customer_base"""
+
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import pickle
+import sqlite3
+
+
+class tiered_customer_base(MutableMapping):
+
+    """tiered_customer_base class.
+    Dictionary-like store that keeps a bounded number of recently used ("hot") customers in memory and
+    spills the rest ("cold" customers) to an embedded SQLite database. It can be passed as the customer_base
+    of the velocity_limit_compiler and yields the same decisions as a plain dictionary.
+
+    Customer entries are mutated in place by the compiler, so an entry becomes dirty once it is handed out
+    by a lookup or stored; only dirty entries are written back when they are evicted from memory or when
+    the store is flushed. Customers loaded by prefetch stay clean until they are looked up. When the
+    in-memory tier is full, the least recently used customers are evicted together and written back in a
+    single transaction, so no more than max_hot_customers customers are ever held in memory.
+
+    Parameters
+    ----------
+    spill_path: str
+        path to the SQLite database holding the cold customers, ':memory:' by default
+
+    max_hot_customers: int
+        maximum number of customers kept in memory, set to 10,000 by default
+
+    write_batch_size: int
+        number of least recently used customers evicted together once the in-memory tier is full, capped at
+        half of max_hot_customers, set to 1,000 by default
+
+    resume: bool
+        if True, the customers already in the database at spill_path are kept; otherwise the database
+        is emptied when the store is opened, set to False by default
+    """
+
+    def __init__(
+        self,
+        spill_path: str = ':memory:',
+        max_hot_customers: int = 10000,
+        write_batch_size: int = 1000,
+        resume: bool = False,
+    ):
+        if max_hot_customers < 1:
+            raise ValueError('max_hot_customers must be at least 1')
+
+        self.spill_path = spill_path
+        self.max_hot_customers = max_hot_customers
+        self.write_batch_size = max(1, min(write_batch_size, max_hot_customers // 2))
+
+        self._hot_customers = OrderedDict()
+        self._dirty_ids = set()
+        self._known_absent = set()
+
+        self._connection = sqlite3.connect(spill_path)
+
+        #Customers left over from a previous run would be treated as already known, so they are dropped unless resuming
+        if not resume:
+            self._connection.execute('DROP TABLE IF EXISTS customer_base')
+
+        self._connection.execute(
+            #customer_id is left untyped so that integer and string ids are stored and returned unchanged
+            'CREATE TABLE IF NOT EXISTS customer_base (customer_id PRIMARY KEY, customer_info BLOB NOT NULL)'
+        )
+        self._connection.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.spill_reads = 0
+        self.spill_writes = 0
+        self.write_transactions = 0
+
+    def __getitem__(
+        self,
+        customer_id: Union[int, str]
+    ) -> Dict:
+
+        if customer_id in self._hot_customers:
+            self.hits += 1
+            self._dirty_ids.add(customer_id)
+            self._hot_customers.move_to_end(customer_id)
+            return self._hot_customers[customer_id]
+
+        customer_info = self._read_cold_customer(customer_id)
+
+        #Customers that are not on file are neither a hit nor a miss
+        if customer_info is None:
+            raise KeyError(customer_id)
+
+        self.misses += 1
+        self._admit(customer_id, customer_info, dirty = True)
+
+        return customer_info
+
+    def __setitem__(
+        self,
+        customer_id: Union[int, str],
+        customer_info: Dict
+    ):
+        self._known_absent.discard(customer_id)
+
+        if customer_id in self._hot_customers:
+            self._hot_customers[customer_id] = customer_info
+            self._dirty_ids.add(customer_id)
+            self._hot_customers.move_to_end(customer_id)
+        else:
+            self._admit(customer_id, customer_info, dirty = True)
+
+    def __delitem__(
+        self,
+        customer_id: Union[int, str]
+    ):
+        if customer_id not in self:
+            raise KeyError(customer_id)
+
+        self._hot_customers.pop(customer_id, None)
+        self._dirty_ids.discard(customer_id)
+        self._connection.execute('DELETE FROM customer_base WHERE customer_id = ?', (customer_id,))
+        self._connection.commit()
+
+    def __contains__(
+        self,
+        customer_id: object
+    ) -> bool:
+
+        if customer_id in self._hot_customers:
+            return True
+
+        if customer_id in self._known_absent:
+            return False
+
+        row = self._connection.execute(
+            'SELECT 1 FROM customer_base WHERE customer_id = ?', (customer_id,)
+        ).fetchone()
+
+        return row is not None
+
+    def __iter__(self) -> Iterator[Union[int, str]]:
+
+        self.flush()
+
+        for (customer_id,) in self._connection.execute('SELECT customer_id FROM customer_base'):
+            yield customer_id
+
+    def __len__(self) -> int:
+
+        self.flush()
+
+        return self._connection.execute('SELECT COUNT(*) FROM customer_base').fetchone()[0]
+
+    def prefetch(
+        self,
+        customer_ids: Iterable[Union[int, str]]
+    ):
+        """loads the cold customers among customer_ids into memory with a single query, so that
+        the load attempts of an upcoming chunk of input can be evaluated without further spill reads
+
+        Parameters
+        ----------
+        customer_ids: Iterable[Union[int, str]]
+            ids of the customers referenced by the upcoming load attempts; only the first
+            max_hot_customers - write_batch_size + 1 distinct ids are prefetched so that a batch eviction
+            triggered by the prefetch never evicts customers of the chunk
+
+        Side Effects
+        ------------
+        cold customers found in the spill store are moved into memory and customers not found anywhere are
+        remembered as absent until the next prefetch
+        """
+
+        self._known_absent = set()
+
+        chunk_ids = list(dict.fromkeys(customer_ids))[:self.max_hot_customers - self.write_batch_size + 1]
+        cold_ids = []
+
+        #Marks the hot customers of the chunk as recently used so the prefetched customers evict other ones
+        for customer_id in chunk_ids:
+            if customer_id in self._hot_customers:
+                self._hot_customers.move_to_end(customer_id)
+            else:
+                cold_ids.append(customer_id)
+
+        for start in range(0, len(cold_ids), 500):
+            id_batch = cold_ids[start:start + 500]
+            placeholders = ','.join('?' * len(id_batch))
+            rows = self._connection.execute(
+                'SELECT customer_id, customer_info FROM customer_base WHERE customer_id IN ({})'.format(placeholders),
+                id_batch
+            ).fetchall()
+
+            found_ids = set()
+            for customer_id, customer_info in rows:
+                self.spill_reads += 1
+                found_ids.add(customer_id)
+                self._admit(customer_id, pickle.loads(customer_info), dirty = False)
+
+            self._known_absent.update(customer_id for customer_id in id_batch if customer_id not in found_ids)
+
+    def flush(self):
+        """writes every dirty in-memory customer back to the spill store in a single transaction
+
+        Side Effects
+        ------------
+        the spill store will hold the latest state of every customer and every in-memory customer is
+        marked clean; the in-memory tier is left untouched
+        """
+
+        self._write_customers([(customer_id, self._hot_customers[customer_id]) for customer_id in self._dirty_ids])
+        self._dirty_ids = set()
+
+    def close(self):
+        """flushes the dirty in-memory customers and closes the connection to the spill store"""
+
+        self.flush()
+        self._connection.close()
+
+    def cache_stats(self) -> Dict[str, float]:
+        """reports the cache hit rate and spill I/O of the store
+
+        Returns
+        -------
+        Dict[str, float]:
+            dictionary with the number of lookups of known customers served from memory (hits) and read from
+            the spill store (misses), the hit rate, the number of customers read from and written to the spill
+            store by lookups and prefetches and the number of write transactions
+        """
+
+        lookups = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'spill_reads': self.spill_reads,
+            'spill_writes': self.spill_writes,
+            'write_transactions': self.write_transactions,
+            'hot_customers': len(self._hot_customers),
+        }
+
+    def _admit(
+        self,
+        customer_id: Union[int, str],
+        customer_info: Dict,
+        dirty: bool
+    ):
+        """adds a customer to the in-memory tier; if the tier is then over max_hot_customers, the write_batch_size
+        least recently used customers are evicted and the dirty ones written back in a single transaction"""
+
+        self._hot_customers[customer_id] = customer_info
+        self._hot_customers.move_to_end(customer_id)
+
+        if dirty:
+            self._dirty_ids.add(customer_id)
+
+        if len(self._hot_customers) > self.max_hot_customers:
+            evicted_customers = []
+
+            for _ in range(self.write_batch_size):
+                evicted_id, evicted_info = self._hot_customers.popitem(last=False)
+
+                if evicted_id in self._dirty_ids:
+                    self._dirty_ids.remove(evicted_id)
+                    evicted_customers.append((evicted_id, evicted_info))
+
+            self._write_customers(evicted_customers)
+
+    def _read_cold_customer(
+        self,
+        customer_id: Union[int, str]
+    ) -> Optional[Dict]:
+        """reads a single customer from the spill store, returns None if the customer is not on file"""
+
+        if customer_id in self._known_absent:
+            return None
+
+        row = self._connection.execute(
+            'SELECT customer_info FROM customer_base WHERE customer_id = ?', (customer_id,)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        self.spill_reads += 1
+
+        return pickle.loads(row[0])
+
+    def _write_customers(
+        self,
+        customers: List[Tuple[Union[int, str], Dict]]
+    ):
+        """writes the given (customer_id, customer_info) pairs to the spill store in a single transaction"""
+
+        if not customers:
+            return
+
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO customer_base (customer_id, customer_info) VALUES (?, ?)',
+                [(customer_id, pickle.dumps(customer_info)) for customer_id, customer_info in customers]
+            )
+
+        self.spill_writes += len(customers)
+        self.write_transactions += 1